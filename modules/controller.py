@@ -3,13 +3,12 @@ Main application controller that control the whole app
 """
 
 import functools
-import time
 
 import streamlit as st
 
 from .data import session_data
 from .data.report_data import ReportData
-from .models.loader import get_model
+from .models.loader import get_model, run_cached
 from .utils import SettingsError
 from .views import (
     view_1_receipt_upload,
@@ -65,9 +64,13 @@ def prev_page() -> None:
     st.rerun()
 
 
-def section_selection_view() -> None:
-    """Display of page selections."""
-    current_page = session_data.current_page.get()
+def section_selection_view(current_page: int, max_page: int) -> None:
+    """Display of page selections.
+
+    Args:
+        current_page (int): the current page number
+        max_page (int): the number of pages available based on user progress
+    """
     page_title = {
         1: "Upload Your Bill",
         2: "Assign Participants",
@@ -103,7 +106,7 @@ def section_selection_view() -> None:
             label="",
             key="next_page",
             icon=":material/arrow_forward_ios:",
-            disabled=(current_page >= get_max_page()),
+            disabled=(current_page >= max_page),
             type="tertiary",
         )
 
@@ -123,12 +126,14 @@ def view_2_done_func() -> None:
 
 def main_view() -> None:
     """Main page view."""
-    model = get_model()
-    section_selection_view()
+    # a model being prefetched is only awaited when reading the receipt
+    if session_data.model_future.get() is None:
+        get_model()
     current_page = session_data.current_page.get()
+    section_selection_view(current_page, get_max_page())
 
     page_options = {
-        1: functools.partial(view_1_receipt_upload.controller, model.run),
+        1: functools.partial(view_1_receipt_upload.controller, run_cached),
         2: view_2_assign_participants.controller,
         3: functools.partial(view_3_report.controller, session_data.report.get()),
     }
@@ -141,12 +146,13 @@ def main_view() -> None:
     should_go_next = page_options[current_page]()
     if should_go_next:
         done_funcs[current_page]()
-        time.sleep(3)
+        st.toast("Moving to next step...", icon="✅")
         next_page()
 
 
 def controller():
     """Application main function."""
+    session_data.init_session_data()
     st.title("💵 Spill Bill Dong")
     author_col, settings_col = st.columns([5, 5])
     with author_col:
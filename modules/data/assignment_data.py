@@ -1,3 +1,4 @@
+from collections import Counter
 from dataclasses import dataclass, field
 
 from .base import IDGenerator
@@ -16,22 +17,30 @@ class ParticipantIDGenerator(IDGenerator):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignedItemData:
-    """Class that handles item assignment."""
+    """Class that handles item assignment.
+
+    Only the item ID is stored, the item itself lives in the receipt data.
+    The count is changed through `SplitManager.set_assigned_count`, which
+    keeps the assigned totals up to date.
+    """
 
-    item: ItemData
+    item_id: int
     assigned_count: int = 0
 
     id: int = field(default_factory=AssignedItemIDGenerator.get)
 
-    def set_count(self, count: int) -> None:
-        """Set number of item assigned in this data.
+    def resolve(self, receipt: ReceiptData) -> ItemData:
+        """Get the assigned item from the receipt.
 
         Args:
-            count (int): number of item
+            receipt (ReceiptData): the receipt the item belongs to
+
+        Returns:
+            ItemData: the assigned item data
         """
-        self.assigned_count = count
+        return receipt[self.item_id]
 
 
 @dataclass
@@ -89,6 +98,9 @@ class SplitManager:
         self.group_data = group_data
         self.receipt_data = receipt_data
         self.participant_assignments: dict[int, list[AssignedItemData]] = {}
+        self._assigned_totals: Counter[int] = Counter()
+        # bumped on every assignment change, to cheaply detect stale views
+        self.revision = 0
 
     @property
     def item_ids(self) -> list[int]:
@@ -97,7 +109,7 @@ class SplitManager:
         Returns:
             list[int]: item IDs
         """
-        return [it.id for it in self.get_all_items()]
+        return self.receipt_data.ids.tolist()
 
     def get_all_items(self) -> list[ItemData]:
         """Get all items from AI reading
@@ -105,7 +117,7 @@ class SplitManager:
         Returns:
             list[ItemData]: list of items from the receipt
         """
-        return list(self.receipt_data.items.values())
+        return list(self.receipt_data)
 
     def get_item(self, item_id: int) -> ItemData:
         """Get an item from AI reading.
@@ -116,7 +128,7 @@ class SplitManager:
         Returns:
             ItemData: the item data
         """
-        return self.receipt_data.items[item_id]
+        return self.receipt_data[item_id]
 
     def get_all_participants(self) -> list[ParticipantData]:
         """Get all participants.
@@ -134,7 +146,11 @@ class SplitManager:
         """
         self.group_data.remove(participant_id)
         if participant_id in self.participant_assignments:
-            self.participant_assignments.pop(participant_id)
+            for assigned_item in self.participant_assignments.pop(participant_id):
+                self._assigned_totals[assigned_item.item_id] -= (
+                    assigned_item.assigned_count
+                )
+            self.revision += 1
 
     def get_items_assignment_total(self, item_id: int) -> int:
         """Get total count of an item that is already assigned to any participant.
@@ -145,14 +161,16 @@ class SplitManager:
         Returns:
             int: number items already assigned from the item
         """
-        total = 0
-        for _, assigned_items in self.participant_assignments.items():
-            total += sum(
-                assigned_item.assigned_count
-                for assigned_item in assigned_items
-                if assigned_item.item.id == item_id
-            )
-        return total
+        return self._assigned_totals[item_id]
+
+    def get_all_assignment_totals(self) -> dict[int, int]:
+        """Get total assigned count of every item of the receipt.
+
+        Returns:
+            dict[int, int]: mapping of item ID to number of items already
+                assigned to any participant
+        """
+        return {item_id: self._assigned_totals[item_id] for item_id in self.item_ids}
 
     def get_participant_items_assignment_list(
         self, participant_id: int
@@ -177,9 +195,26 @@ class SplitManager:
             item_id (int): item ID (from AI) to be assigned to the participant
         """
         participant_items = self.get_participant_items_assignment_list(participant_id)
-        participant_items.append(
-            AssignedItemData(self.get_item(item_id), assigned_count=1)
+        participant_items.append(AssignedItemData(item_id, assigned_count=1))
+        self._assigned_totals[item_id] += 1
+        self.revision += 1
+
+    def set_assigned_count(self, participant_id: int, idx: int, count: int) -> None:
+        """Set number of item assigned in one of participant's item assignments.
+
+        Args:
+            participant_id (int): participant ID
+            idx (int): index of the item assignment in the participant's list
+            count (int): new number of item
+        """
+        assigned_item = self.get_participant_items_assignment_list(participant_id)[idx]
+        if count == assigned_item.assigned_count:
+            return
+        self._assigned_totals[assigned_item.item_id] += (
+            count - assigned_item.assigned_count
         )
+        assigned_item.assigned_count = count
+        self.revision += 1
 
     def remove_items_assignment(
         self, participant_id: int, item_idxs: list[int]
@@ -192,4 +227,6 @@ class SplitManager:
         """
         participant_items = self.get_participant_items_assignment_list(participant_id)
         for idx in item_idxs:
-            participant_items.pop(idx)
+            removed_item = participant_items.pop(idx)
+            self._assigned_totals[removed_item.item_id] -= removed_item.assigned_count
+        self.revision += 1
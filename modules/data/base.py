@@ -1,13 +1,21 @@
+import itertools
 from typing import ClassVar
 
 
 class IDGenerator:
-    """Unique ID generator."""
+    """Unique ID generator.
 
-    num: ClassVar[int] = 0
+    Every subclass gets its own counter, so IDs are unique per subclass.
+    """
+
+    _counter: ClassVar[itertools.count] = itertools.count(1)
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Give the new generator its own counter."""
+        super().__init_subclass__(**kwargs)
+        cls._counter = itertools.count(1)
 
     @classmethod
     def get(cls) -> int:
         """Get new ID."""
-        cls.num += 1
-        return cls.num
+        return next(cls._counter)
@@ -1,5 +1,8 @@
-from dataclasses import asdict, dataclass, field
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from functools import cached_property
 
+import numpy as np
 import pandas as pd
 
 from .base import IDGenerator
@@ -11,7 +14,7 @@ class ItemIDGenerator(IDGenerator):
     pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ItemData:
     """Item data from the receipt."""
 
@@ -20,31 +23,121 @@ class ItemData:
     total_price: float
 
     id: int = field(default_factory=ItemIDGenerator.get)
+    unit_price: float = field(init=False, repr=False, compare=False)
 
-    @property
-    def unit_price(self) -> float:
-        """Get unit price of the item.
+    def __post_init__(self) -> None:
+        """Compute the unit price once, since the item is immutable."""
+        unit_price = self.total_price / self.count if self.count != 0 else 0.0
+        object.__setattr__(self, "unit_price", unit_price)
+
+
+@dataclass(eq=False)
+class ReceiptData:
+    """Receipt data from AI reading.
+
+    Items are stored column-wise, every array has one entry per item.
+    Use `receipt[item_id]` or iterate the receipt to get items as `ItemData`.
+    """
+
+    ids: np.ndarray
+    names: np.ndarray
+    counts: np.ndarray
+    total_prices: np.ndarray
+    total: float
+
+    def __len__(self) -> int:
+        """Number of items.
 
         Returns:
-            float: item's unit price
+            int: number of items in the receipt
         """
-        return self.total_price / self.count
+        return len(self.ids)
 
+    def __getitem__(self, item_id: int) -> ItemData:
+        """Get an item of the receipt.
 
-@dataclass
-class ReceiptData:
-    """Receipt data from AI reading."""
+        Args:
+            item_id (int): the item ID
 
-    items: dict[int, ItemData]
-    total: float
+        Returns:
+            ItemData: the item data
+        """
+        return self._item_at(self._index[item_id])
+
+    def __iter__(self) -> Iterator[ItemData]:
+        """Iterate over the items of the receipt.
+
+        Returns:
+            Iterator[ItemData]: the items data
+        """
+        return (self._item_at(idx) for idx in range(len(self)))
 
-    @property
+    def positions(self, item_ids: Iterable[int]) -> np.ndarray:
+        """Get positions of items in the item arrays.
+
+        Args:
+            item_ids (Iterable[int]): the items IDs
+
+        Returns:
+            np.ndarray: position of each item, to index the item arrays
+        """
+        index = self._index
+        return np.fromiter((index[item_id] for item_id in item_ids), dtype=np.intp)
+
+    def _item_at(self, idx: int) -> ItemData:
+        """Build the item data at a position of the item arrays."""
+        return ItemData(
+            name=self.names[idx],
+            count=int(self.counts[idx]),
+            total_price=float(self.total_prices[idx]),
+            id=int(self.ids[idx]),
+        )
+
+    @cached_property
+    def _index(self) -> dict[int, int]:
+        """Mapping of item ID to its position in the item arrays."""
+        return {item_id: idx for idx, item_id in enumerate(self.ids.tolist())}
+
+    @cached_property
+    def unit_prices(self) -> np.ndarray:
+        """Unit price of each item, zero for items with zero count."""
+        return np.divide(
+            self.total_prices,
+            self.counts,
+            out=np.zeros_like(self.total_prices),
+            where=self.counts != 0,
+        )
+
+    @cached_property
     def subtotal(self) -> float:
         """Subtotal of the receipt.
 
-        Which is sum of all items total price.
+        Which is sum of all items total price. Computed once,
+        items are not changed after the receipt is created.
         """
-        return sum(item.total_price for item in self.items.values())
+        return float(self.total_prices.sum())
+
+    def copy(self) -> "ReceiptData":
+        """Copy this data, items arrays are not shared with the copy.
+
+        Returns:
+            ReceiptData: the copied data
+        """
+        return ReceiptData(
+            ids=self.ids.copy(),
+            names=self.names.copy(),
+            counts=self.counts.copy(),
+            total_prices=self.total_prices.copy(),
+            total=self.total,
+        )
+
+    @cached_property
+    def items_df(self) -> pd.DataFrame:
+        """Items as pandas DataFrame, built once.
+
+        Treat it as read-only, use `to_items_df` to get a new DataFrame.
+        """
+        return self.to_items_df()
 
     def to_items_df(self) -> pd.DataFrame:
         """Convert data to pandas DataFrame.
@@ -52,13 +145,79 @@ class ReceiptData:
         Returns:
             pd.DataFrame: data as DataFrame
         """
-        return pd.DataFrame([asdict(item) for item in self.items.values()])
+        return pd.DataFrame(
+            {
+                "name": self.names,
+                "count": self.counts,
+                "total_price": self.total_prices,
+                "id": self.ids,
+            }
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        names: Sequence[str],
+        counts: Sequence[int],
+        total_prices: Sequence[float],
+        total: float,
+    ) -> "ReceiptData":
+        """Build this data from items columns, new item IDs are generated.
+
+        Args:
+            names (Sequence[str]): items names
+            counts (Sequence[int]): items counts
+            total_prices (Sequence[float]): items total prices
+            total (float): total price of the receipt, after tax, discount, etc.
+
+        Returns:
+            ReceiptData: receipt data
+        """
+        num_items = len(names)
+        return cls(
+            ids=np.fromiter(
+                (ItemIDGenerator.get() for _ in range(num_items)),
+                dtype=np.int64,
+                count=num_items,
+            ),
+            names=np.asarray(names, dtype=object),
+            counts=np.asarray(counts, dtype=np.int64),
+            total_prices=np.asarray(total_prices, dtype=np.float64),
+            total=float(total),
+        )
+
+    @classmethod
+    def merge(cls, receipts: list["ReceiptData"]) -> "ReceiptData":
+        """Combine data read from several pages of the same receipt.
+
+        The total is the sum of the pages totals, pages without a total
+        contribute 0. A page repeating a running total is counted twice,
+        the user corrects the total when confirming the read data.
+
+        Args:
+            receipts (list[ReceiptData]): receipt data of each page
+
+        Returns:
+            ReceiptData: combined receipt data
+        """
+        if len(receipts) == 1:
+            return receipts[0]
+        return cls(
+            ids=np.concatenate([receipt.ids for receipt in receipts]),
+            names=np.concatenate([receipt.names for receipt in receipts]),
+            counts=np.concatenate([receipt.counts for receipt in receipts]),
+            total_prices=np.concatenate(
+                [receipt.total_prices for receipt in receipts]
+            ),
+            total=sum(receipt.total for receipt in receipts),
+        )
 
     @classmethod
     def from_items_df(cls, items_df: pd.DataFrame, total: float) -> "ReceiptData":
         """Build this data from a DataFrame.
 
-        Expected columns are "name", "count", and "total_price".
+        Expected columns are "name", "count", and "total_price". Rows with
+        any of them missing, e.g. rows added but not filled, are dropped.
 
         Args:
             items_df (pd.DataFrame): DataFrame to be converted
@@ -67,12 +226,10 @@ class ReceiptData:
         Returns:
             ReceiptData: parsed receipt data
         """
-        items = [
-            ItemData(
-                name=row["name"],
-                count=row["count"],
-                total_price=row["total_price"],
-            )
-            for _, row in items_df.iterrows()
-        ]
-        return cls(items={it.id: it for it in items}, total=total)
+        items_df = items_df.dropna(subset=["name", "count", "total_price"])
+        return cls.from_columns(
+            names=items_df["name"].to_numpy(dtype=object),
+            counts=items_df["count"].to_numpy(dtype=np.int64),
+            total_prices=items_df["total_price"].to_numpy(dtype=np.float64),
+            total=total,
+        )
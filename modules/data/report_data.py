@@ -1,11 +1,26 @@
 from dataclasses import dataclass
 from typing import Self
 
+import numpy as np
 import pandas as pd
 
 from modules.utils import format_number_to_currency
 
 from .assignment_data import AssignedItemData, ParticipantData, SplitManager
+from .receipt_data import ReceiptData
+
+
+def _compute_subtotal(counts: np.ndarray, unit_prices: np.ndarray) -> float:
+    """Compute subtotal of purchased items.
+
+    Args:
+        counts (np.ndarray): purchased count of each item
+        unit_prices (np.ndarray): unit price of each item
+
+    Returns:
+        float: sum of count times unit price of all items
+    """
+    return float(np.dot(counts, unit_prices))
 
 
 @dataclass
@@ -17,23 +32,6 @@ class PurchasedItemReportData:
     purchased_count: int
     unit_price: float
 
-    @classmethod
-    def from_item_assignment_data(cls, item_assignment: AssignedItemData) -> Self:
-        """Create report for an item.
-
-        Args:
-            item_assignment (AssignedItemData): Item assignment data
-
-        Returns:
-            Self: parsed report
-        """
-        return cls(
-            item_id=item_assignment.item.id,
-            name=item_assignment.item.name,
-            purchased_count=item_assignment.assigned_count,
-            unit_price=item_assignment.item.unit_price,
-        )
-
     @property
     def total(self) -> float:
         """Purchased total price of this item report.
@@ -68,8 +66,7 @@ class ParticipantReportData:
         cls,
         participant: ParticipantData,
         assigned_items: list[AssignedItemData],
-        receipt_subtotal: float,
-        receipt_total: float,
+        receipt: ReceiptData,
     ) -> Self:
         """Generate participant report from assignment data.
 
@@ -77,18 +74,33 @@ class ParticipantReportData:
             participant (ParticipantData): the participant data
             assigned_items (list[AssignedItemData]): items assignment for
                 this participant
-            receipt_subtotal (float): subtotal of the overall receipt
-            receipt_total (float): total oft he overall receipt
+            receipt (ReceiptData): the overall receipt data
 
         Returns:
             Self: the generated report data
         """
+        positions = receipt.positions(it.item_id for it in assigned_items)
+        counts = np.fromiter(
+            (it.assigned_count for it in assigned_items),
+            dtype=np.float64,
+            count=len(assigned_items),
+        )
+        unit_prices = receipt.unit_prices[positions]
         purchased_items = [
-            PurchasedItemReportData.from_item_assignment_data(it)
-            for it in assigned_items
+            PurchasedItemReportData(
+                item_id=it.item_id,
+                name=name,
+                purchased_count=it.assigned_count,
+                unit_price=unit_price,
+            )
+            for it, name, unit_price in zip(
+                assigned_items,
+                receipt.names[positions].tolist(),
+                unit_prices.tolist(),
+            )
         ]
-        subtotal = sum(it.total for it in purchased_items)
-        total = (subtotal / receipt_subtotal) * receipt_total
+        subtotal = _compute_subtotal(counts, unit_prices)
+        total = (subtotal / receipt.subtotal) * receipt.total
         return cls(
             participant_id=participant.id,
             name=participant.name,
@@ -97,9 +109,13 @@ class ParticipantReportData:
             purchased_total=total,
         )
 
-    def to_dataframe_display(self) -> pd.DataFrame:
+    def to_dataframe_display(self, currency: str | None = None) -> pd.DataFrame:
         """Convert this data to a DataFrame for display purpose.
 
+        Args:
+            currency (str | None): currency code used to format prices,
+                defaults to the one in the session
+
         Returns:
             pd.DataFrame: generated DataFrame
         """
@@ -107,8 +123,8 @@ class ParticipantReportData:
             {
                 "Name": it.name,
                 "Count": it.purchased_count,
-                "Unit price": format_number_to_currency(it.unit_price),
-                "Total": format_number_to_currency(it.total),
+                "Unit price": format_number_to_currency(it.unit_price, currency),
+                "Total": format_number_to_currency(it.total, currency),
             }
             for it in self.purchased_items
         ]
@@ -133,15 +149,12 @@ class ReportData:
         Returns:
             Self: generated report data
         """
-        order_subtotal = manager.receipt_data.subtotal
-        order_total = manager.receipt_data.total
         return cls(
             participants_reports=[
                 ParticipantReportData.from_assignment_data(
                     p,
                     manager.get_participant_items_assignment_list(p.id),
-                    order_subtotal,
-                    order_total,
+                    manager.receipt_data,
                 )
                 for p in manager.get_all_participants()
             ],
@@ -1,3 +1,4 @@
+from concurrent.futures import Future
 from typing import Generic
 
 import streamlit as st
@@ -14,6 +15,8 @@ from .report_data import ReportData
 T = TypeVar("T")
 V = TypeVar("V", default=None)
 
+_all_states: list["SessionDataManager"] = []
+
 
 class SessionDataManager(Generic[T, V]):
     """Helper class to interact with a streamlit session state."""
@@ -30,15 +33,21 @@ class SessionDataManager(Generic[T, V]):
         """
         self.state_name = state_name
         self.default = default
+        _all_states.append(self)
+
+    def init(self) -> None:
+        """Set the state to its default value if it does not exist yet."""
+        if self.state_name not in st.session_state:
+            st.session_state[self.state_name] = self.default
 
     def get(self) -> T | V:
         """Get the state value.
 
+        `init_session_data` must have been called in this session.
+
         Returns:
             T | V: current state value
         """
-        if self.state_name not in st.session_state:
-            st.session_state[self.state_name] = self.default
         return st.session_state[self.state_name]
 
     def set(self, value: T) -> None:
@@ -65,9 +74,16 @@ class SessionDataManager(Generic[T, V]):
 
 
 model = SessionDataManager[AIModel]("model")
+model_future = SessionDataManager[Future[AIModel]]("model_future")
 model_name = SessionDataManager[ModelNames, ModelNames]("model_name", ModelNames.GEMINI)
+donut_quantize = SessionDataManager[bool, bool]("donut_quantize", False)
 currency = SessionDataManager[str, str]("currency", "IDR")
-image = SessionDataManager[Image.Image]("image")
+images = SessionDataManager[list[Image.Image]]("images")
+# uploaded file content, mime type and image size in the file
+image_files = SessionDataManager[list[tuple[bytes, str, tuple[int, int]]]](
+    "image_files"
+)
+image_previews = SessionDataManager[list[Future[Image.Image]]]("image_previews")
 receipt_data = SessionDataManager[ReceiptData]("receipt_data")
 group_data = SessionDataManager[GroupData, GroupData]("group_data", GroupData())
 current_page = SessionDataManager[int, int]("current_page", 1)
@@ -77,8 +93,25 @@ view1_model_result = SessionDataManager[ReceiptData]("view1_model_result")
 view1_auto_next_page = SessionDataManager[bool, bool]("view1_auto_next_page", False)
 
 
+def init_session_data() -> None:
+    """Register default values of all session states.
+
+    Must be called at the start of every script run, before any state is read.
+    """
+    for state in _all_states:
+        state.init()
+
+
 def reset_receipt_data() -> None:
     """Reset the receipt data to reset the user progress."""
     receipt_data.reset()
     split_manager.reset()
     view1_model_result.reset()
+
+
+def reset_uploaded_images() -> None:
+    """Reset the uploaded images, and the user progress that depends on them."""
+    images.reset()
+    image_files.reset()
+    image_previews.reset()
+    reset_receipt_data()
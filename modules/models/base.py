@@ -19,3 +19,17 @@ class AIModel(ABC):
             ReceiptData: parsed receipt data
         """
         pass
+
+    def run_batch(self, images: list[Image.Image]) -> list[ReceiptData]:
+        """Retrieve data from several receipt pages.
+
+        Models that can process a batch in a single forward pass
+        should override this, by default pages are read one by one.
+
+        Args:
+            images (list[Image.Image]): the receipt photo images
+
+        Returns:
+            list[ReceiptData]: parsed receipt data, one per image
+        """
+        return [self.run(image) for image in images]
@@ -1,22 +1,145 @@
+import threading
+from dataclasses import dataclass
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+import streamlit as st
 import torch
-import xmltodict
+from lxml import etree
 from PIL import Image
-from transformers import AutoModelForVision2Seq, AutoProcessor
+from transformers import (
+    AutoModelForVision2Seq,
+    AutoProcessor,
+    BitsAndBytesConfig,
+    CompileConfig,
+)
 
-from modules.data.receipt_data import ItemData, ReceiptData
+from modules.data.receipt_data import ReceiptData
 
 from .base import AIModel
 
 MODEL_NAME = "naver-clova-ix/donut-base-finetuned-cord-v2"
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+DTYPE = torch.float16 if DEVICE == "cuda" else torch.float32
+HAS_BITSANDBYTES = find_spec("bitsandbytes") is not None
+
+# Receipt sized generation limit, also the size of the static KV-cache
+MAX_LENGTH = 768
+
+# The model and its static KV-cache are shared by all sessions,
+# generations must not run concurrently
+_GENERATE_LOCK = threading.Lock()
+
+# lxml parsers must not be shared between threads, each session thread gets
+# its own, created on first use
+_xml_parsers = threading.local()
+
+
+@dataclass
+class DonutPrediction:
+    """Fields of a Donut prediction used to build the receipt data."""
+
+    names: list[str]
+    counts: list[str]
+    prices: list[str]
+    total_price: str | None
+
+
+@st.cache_resource(show_spinner=False)
+def _load_donut(
+    quantize: bool = False,
+) -> tuple[AutoProcessor, AutoModelForVision2Seq]:
+    """Load Donut processor and model once per server process.
+
+    When quantization is requested, the BART decoder linear layers are
+    converted to int8, using bitsandbytes on CUDA if it is installed, or
+    torch dynamic quantization on CPU. The Swin encoder is kept as is
+    since it only runs once per image, and so is the output projection
+    (lm_head) to preserve output quality.
+
+    Args:
+        quantize (bool, optional): whether to quantize the decoder to int8.
+            Defaults to False.
+
+    Returns:
+        tuple[AutoProcessor, AutoModelForVision2Seq]: processor and model
+    """
+    processor = AutoProcessor.from_pretrained(MODEL_NAME)
+    if quantize and DEVICE == "cuda" and HAS_BITSANDBYTES:
+        model = AutoModelForVision2Seq.from_pretrained(
+            MODEL_NAME,
+            quantization_config=BitsAndBytesConfig(
+                load_in_8bit=True, llm_int8_skip_modules=["encoder", "lm_head"]
+            ),
+            torch_dtype=DTYPE,
+            device_map="auto",
+        )
+        return processor, model.eval()
+
+    model = AutoModelForVision2Seq.from_pretrained(MODEL_NAME)
+    model.to(DEVICE, dtype=DTYPE).eval()
+    if quantize and DEVICE == "cpu":
+        model.decoder = torch.ao.quantization.quantize_dynamic(
+            model.decoder, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if DEVICE == "cuda":
+        _compile_and_warmup(processor, model)
+    return processor, model
+
+
+def _compile_and_warmup(
+    processor: AutoProcessor, model: AutoModelForVision2Seq
+) -> None:
+    """Use a static KV-cache, compiled by generate, and run a warmup generation.
+
+    With a static cache on CUDA, generate compiles the decoding step by
+    itself with the given compile config. The warmup makes the first user
+    request not pay the compilation cost.
+
+    Args:
+        processor (AutoProcessor): Donut processor
+        model (AutoModelForVision2Seq): Donut model, already on CUDA
+    """
+    model.generation_config.cache_implementation = "static"
+    model.generation_config.compile_config = CompileConfig(fullgraph=False)
+    size = processor.image_processor.size
+    dummy_pixels = torch.zeros(
+        (1, 3, size["height"], size["width"]), device=DEVICE, dtype=DTYPE
+    )
+    decoder_input_ids = processor.tokenizer(
+        "<s_cord-v2>", add_special_tokens=False, return_tensors="pt"
+    ).input_ids.to(DEVICE)
+    with torch.inference_mode(), torch.autocast(DEVICE, dtype=DTYPE):
+        model.generate(
+            dummy_pixels,
+            decoder_input_ids=decoder_input_ids,
+            max_length=MAX_LENGTH,
+            pad_token_id=processor.tokenizer.pad_token_id,
+            eos_token_id=processor.tokenizer.eos_token_id,
+            use_cache=True,
+            num_beams=1,
+        )
 
 
 class DonutModel(AIModel):
     """Receipt reader based on Donut model."""
 
-    def __init__(self) -> None:
-        """Initialize the model."""
-        self.processor = AutoProcessor.from_pretrained(MODEL_NAME)
-        self.model = AutoModelForVision2Seq.from_pretrained(MODEL_NAME)
+    def __init__(self, quantize: bool = False) -> None:
+        """Initialize the model.
+
+        Args:
+            quantize (bool, optional): quantize the decoder to int8.
+                Defaults to False.
+        """
+        self.processor, self.model = _load_donut(quantize)
+        self.device = DEVICE
+        tokenizer = self.processor.tokenizer
+        self.pad_token_id: int = tokenizer.pad_token_id
+        self.eos_token_id: int = tokenizer.eos_token_id
+        self.bad_words_ids: list[list[int]] = [[tokenizer.unk_token_id]]
+        size = self.processor.image_processor.size
+        self.input_size: tuple[int, int] = (size["width"], size["height"])
 
     def run(self, image: Image.Image) -> ReceiptData:
         """Retrieve data from the receipt.
@@ -27,89 +150,159 @@ class DonutModel(AIModel):
         Returns:
             ReceiptData: parsed receipt data
         """
-        text_input, image_input = self._preprocess(image)
-        prediction_str = self._inference(image_input, text_input)
-        receipt_dict = self._postprocess(prediction_str)
-        print(receipt_dict)
-        return self._formatting(receipt_dict)
+        return self.run_batch([image])[0]
 
-    def _preprocess(self, image: Image.Image) -> tuple[torch.Tensor, torch.Tensor]:
+    def run_batch(self, images: list[Image.Image]) -> list[ReceiptData]:
+        """Retrieve data from several receipt pages in a single forward pass.
+
+        Args:
+            images (list[Image.Image]): the receipt photo images
+
+        Returns:
+            list[ReceiptData]: parsed receipt data, one per image
+        """
+        text_input, image_input = self._preprocess(images)
+        prediction_strs = self._inference(image_input, text_input)
+        return [
+            self._formatting(self._postprocess(prediction_str))
+            for prediction_str in prediction_strs
+        ]
+
+    def _preprocess(
+        self, images: list[Image.Image]
+    ) -> tuple[torch.Tensor, torch.Tensor]:
         """Preprocess image data and generate start token.
 
         Args:
-            image (Image.Image): loaded image
+            images (list[Image.Image]): loaded images
 
         Returns:
-            tuple[torch.Tensor, torch.Tensor]: start token and processed image
+            tuple[torch.Tensor, torch.Tensor]: start tokens [B, L] and
+                processed images [B, 3, H, W]
         """
         decoder_input_ids = self.processor.tokenizer(
             "<s_cord-v2>", add_special_tokens=False
         ).input_ids
-        decoder_input_ids = torch.tensor(decoder_input_ids).unsqueeze(0)
-        pixel_values = self.processor(image, return_tensors="pt").pixel_values
-        return decoder_input_ids, pixel_values
+        decoder_input_ids = torch.tensor(decoder_input_ids).repeat(len(images), 1)
+        images = [self._fit_to_input_size(image) for image in images]
+        pixel_values = self.processor(images, return_tensors="pt").pixel_values
+        return (
+            decoder_input_ids.to(self.device),
+            pixel_values.to(self.device, dtype=DTYPE),
+        )
+
+    def _fit_to_input_size(self, image: Image.Image) -> Image.Image:
+        """Downscale image to fit the model input size, keeping aspect ratio.
 
-    def _inference(self, image_input: torch.Tensor, text_input: torch.Tensor) -> str:
+        Done with PIL before the processor, which is much slower to
+        resize large phone photos. Images that already fit are kept as is.
+
+        Args:
+            image (Image.Image): loaded image
+
+        Returns:
+            Image.Image: image that fits the model input size
+        """
+        max_width, max_height = self.input_size
+        ratio = min(max_width / image.width, max_height / image.height)
+        if ratio >= 1:
+            return image
+        new_size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+        return image.resize(new_size, Image.Resampling.LANCZOS)
+
+    def _inference(
+        self, image_input: torch.Tensor, text_input: torch.Tensor
+    ) -> list[str]:
         """Run model inference.
 
         Args:
-            image_input (torch.Tensor): pre-processed image
-            text_input (torch.Tensor): start token
+            image_input (torch.Tensor): pre-processed images
+            text_input (torch.Tensor): start tokens
 
         Returns:
-            str: read results, still in xml format, not including start token
+            list[str]: read results per image, still in xml format,
+                not including start token
         """
-        generation_output = self.model.generate(
-            image_input,
-            decoder_input_ids=text_input,
-            max_length=self.model.decoder.config.max_position_embeddings,
-            pad_token_id=self.processor.tokenizer.pad_token_id,
-            eos_token_id=self.processor.tokenizer.eos_token_id,
-            use_cache=True,
-            num_beams=1,
-            bad_words_ids=[[self.processor.tokenizer.unk_token_id]],
-            return_dict_in_generate=True,
-        )
-        return self.processor.batch_decode(generation_output.sequences)[0]
+        with (
+            _GENERATE_LOCK,
+            torch.inference_mode(),
+            torch.autocast(self.device, dtype=DTYPE, enabled=self.device == "cuda"),
+        ):
+            generation_output = self.model.generate(
+                image_input,
+                decoder_input_ids=text_input,
+                max_length=MAX_LENGTH,
+                pad_token_id=self.pad_token_id,
+                eos_token_id=self.eos_token_id,
+                use_cache=True,
+                num_beams=1,
+                bad_words_ids=self.bad_words_ids,
+                return_dict_in_generate=True,
+            )
+        return self.processor.batch_decode(generation_output.sequences)
 
-    def _postprocess(self, prediction_str: str) -> dict:
+    def _postprocess(self, prediction_str: str) -> DonutPrediction:
         """Process model predictions.
 
         Args:
             prediction_str (str): raw predictions from the model
 
         Returns:
-            dict: processed prediction as dictionary
+            DonutPrediction: fields parsed from the prediction
         """
         prediction_str = prediction_str.replace(self.processor.tokenizer.eos_token, "")
         prediction_str = prediction_str.replace(self.processor.tokenizer.pad_token, "")
-        prediction_str += "</s_cord-v2>"
-        bill_dict = xmltodict.parse(prediction_str)
-        return bill_dict
+        root = etree.fromstring(prediction_str.encode(), parser=_get_xml_parser())
+        return DonutPrediction(
+            names=[el.text or "" for el in root.iterfind(".//s_menu/s_nm")],
+            counts=[el.text or "" for el in root.iterfind(".//s_menu/s_cnt")],
+            prices=[el.text or "" for el in root.iterfind(".//s_menu/s_price")],
+            total_price=root.findtext(".//s_total/s_total_price"),
+        )
 
-    def _formatting(self, receipt_dict: dict) -> ReceiptData:
-        """Parse dictionary data of model predictions.
+    def _formatting(self, prediction: DonutPrediction) -> ReceiptData:
+        """Parse fields of model predictions.
 
         Args:
-            receipt_dict (dict): prediction dictionary
+            prediction (DonutPrediction): parsed prediction fields
 
         Returns:
             ReceiptData: parsed receipt data
         """
-        data_dict = receipt_dict["s_cord-v2"]
-        item_names = data_dict["s_menu"]["s_nm"]
-        item_counts = data_dict["s_menu"]["s_cnt"]
-        item_price = data_dict["s_menu"]["s_price"]
-        items = [
-            ItemData(
-                name=name,
-                count=int(count),
-                total_price=_convert_price_str_to_float(price),
-            )
-            for name, count, price in zip(item_names, item_counts, item_price)
-        ]
-        total = _convert_price_str_to_float(data_dict["s_total"]["s_total_price"])
-        return ReceiptData(items={it.id: it for it in items}, total=total)
+        num_items = min(
+            len(prediction.names), len(prediction.counts), len(prediction.prices)
+        )
+        counts = pd.Series(prediction.counts[:num_items], dtype=str).astype(np.int64)
+        prices = (
+            pd.Series(prediction.prices[:num_items], dtype=str)
+            .str.replace(",", "", regex=False)
+            .astype(np.float64)
+        )
+        return ReceiptData.from_columns(
+            names=prediction.names[:num_items],
+            counts=counts.to_numpy(),
+            total_prices=prices.to_numpy(),
+            # pages of a multi-page receipt other than the last one have no total
+            total=(
+                _convert_price_str_to_float(prediction.total_price)
+                if prediction.total_price is not None
+                else 0.0
+            ),
+        )
+
+
+def _get_xml_parser() -> etree.XMLParser:
+    """Get the XML parser of the current thread.
+
+    recover=True closes the root tag, which is not generated by the model.
+
+    Returns:
+        etree.XMLParser: the parser for model predictions
+    """
+    parser = getattr(_xml_parsers, "parser", None)
+    if parser is None:
+        parser = _xml_parsers.parser = etree.XMLParser(recover=True)
+    return parser
 
 
 def _convert_price_str_to_float(price_str: str) -> float:
@@ -1,16 +1,58 @@
+from collections import defaultdict
 import easyocr
 import numpy as np
+import pandas as pd
 import re
+import streamlit as st
+import torch
 from PIL import Image
-from modules.data.receipt_data import ItemData, ReceiptData
+from modules.data.receipt_data import ReceiptData
 from .base import AIModel
 
+_PRICE_RE = re.compile(r'(\d{1,3}(?:[.,]\d{3})+(?:,\d+)?|\d+)')
+_SEPARATOR_RE = re.compile(r'[.,]')
+
+# Keywords of receipt lines that are not purchased items
+_EXCLUDE = frozenset([
+    'total', 'subtotal', 'sub-total', 'grand total',
+    'jumlah', 'amount', 'tagihan', 'bill',
+    'tax', 'pajak', 'ppn', 'vat', 'gst', 'pb1',
+    'service', 'charge', 'layanan', 'biaya', 'gratuity', 'tip',
+    'tunai', 'cash', 'kembali', 'change', 'kembalian',
+    'bayar', 'paid', 'payment', 'tender', 'balance', 'sisa', 'due',
+    'debit', 'credit', 'kredit', 'card', 'kartu', 'visa', 'master',
+    'diskon', 'discount', 'disc', 'rounding', 'pembulatan'
+])
+
+
+# Image shape (H, W, C) used to warm up cuDNN autotuner
+WARMUP_SHAPE = (640, 480, 3)
+
+
+@st.cache_resource(show_spinner=False)
+def _load_easyocr_reader() -> easyocr.Reader:
+    """Load EasyOCR reader (CRAFT + CRNN weights) once per server process.
+
+    On GPU, a warmup pass is run so cuDNN picks its algorithms now
+    instead of on the first user upload.
+    """
+    use_gpu = torch.cuda.is_available()
+    reader = easyocr.Reader(['id', 'en'], gpu=use_gpu, cudnn_benchmark=use_gpu)
+    if use_gpu:
+        try:
+            reader.readtext(np.zeros(WARMUP_SHAPE, dtype=np.uint8))
+        except Exception:
+            # blank image may have no text to recognize, warmup is still done
+            pass
+    return reader
+
+
 class EasyOCRModel(AIModel):
     """Receipt reader based on EasyOCR."""
 
     def __init__(self) -> None:
         """Initialize the model."""
-        self.reader = easyocr.Reader(['id', 'en'], gpu=False)
+        self.reader = _load_easyocr_reader()
 
     def run(self, image: Image.Image) -> ReceiptData:
         """Retrieve data from the receipt.
@@ -27,38 +69,49 @@ class EasyOCRModel(AIModel):
         # Parsing
         return self._parse_raw_text(raw_text_list)
 
+    def run_batch(self, images: list[Image.Image]) -> list[ReceiptData]:
+        """Retrieve data from several receipt pages, batching same sized pages.
+
+        EasyOCR batched inference resizes every page to one size, so only
+        pages sharing the same size are batched together, to not distort
+        the others. Pages with a unique size are read one by one.
+
+        Args:
+            images (list[Image.Image]): the receipt photo images
+
+        Returns:
+            list[ReceiptData]: parsed receipt data, one per image
+        """
+        pages_by_size: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for idx, image in enumerate(images):
+            pages_by_size[image.size].append(idx)
+
+        results: list[ReceiptData | None] = [None] * len(images)
+        for (n_width, n_height), idxs in pages_by_size.items():
+            if len(idxs) == 1:
+                results[idxs[0]] = self.run(images[idxs[0]])
+                continue
+            images_np = [np.array(images[idx].convert("RGB")) for idx in idxs]
+            raw_text_lists = self.reader.readtext_batched(
+                images_np, n_width=n_width, n_height=n_height, detail=0
+            )
+            for idx, text_list in zip(idxs, raw_text_lists):
+                results[idx] = self._parse_raw_text(text_list)
+        return results
+
     def _parse_raw_text(self, text_list: list[str]) -> ReceiptData:
         """Simple parsing logic to convert text list to ReceiptData."""
-        items = []
-        total_accumulated = 0.0
-
-        price_pattern = r'(\d{1,3}(?:[.,]\d{3})+(?:,\d+)?|\d+)'
-        
-        # Generate AI keywords for exclude
-        exclude_keywords = [
-            'total', 'subtotal', 'sub-total', 'grand total',
-            'jumlah', 'amount', 'tagihan', 'bill',
-            'tax', 'pajak', 'ppn', 'vat', 'gst', 'pb1',
-            'service', 'charge', 'layanan', 'biaya', 'gratuity', 'tip',
-            'tunai', 'cash', 'kembali', 'change', 'kembalian',
-            'bayar', 'paid', 'payment', 'tender', 'balance', 'sisa', 'due',
-            'debit', 'credit', 'kredit', 'card', 'kartu', 'visa', 'master',
-            'diskon', 'discount', 'disc', 'rounding', 'pembulatan'
-        ]
+        item_names = []
+        price_strs = []
+
         # Cek line by line
         for i, text in enumerate(text_list):
             clean_text = text.strip()
             
-            match = re.search(price_pattern, clean_text)
+            match = _PRICE_RE.search(clean_text)
             
             if match:
                 price_str = match.group(0)
-                try:
-                    price_val = self._convert_price_str_to_float(price_str)
-                except ValueError:
-                    continue
-
-                
                 possible_name = clean_text.replace(price_str, "").replace("Rp", "").strip()
                 
                 if len(possible_name) > 2:
@@ -68,18 +121,22 @@ class EasyOCRModel(AIModel):
                 else:
                     item_name = "Unknown Item"
 
-                if not any(k in item_name.lower() for k in exclude_keywords):
-                    new_item = ItemData(
-                        name=item_name,
-                        count=1,
-                        total_price=price_val
-                    )
-                    items.append(new_item)
-                    total_accumulated += price_val
-
-        return ReceiptData(items={it.id: it for it in items}, total=total_accumulated)
-
-    def _convert_price_str_to_float(self, price_str: str) -> float:
-        """Helper to cleanup price string."""
-        clean = price_str.lower().replace("rp", "").replace(".", "").replace(",", "").strip()
-        return float(clean)
\ No newline at end of file
+                name_lc = item_name.lower()
+                if not any(k in name_lc for k in _EXCLUDE):
+                    item_names.append(item_name)
+                    price_strs.append(price_str)
+
+        # Convert all detected prices at once
+        prices = self._convert_prices_to_float(price_strs)
+        return ReceiptData.from_columns(
+            names=item_names,
+            counts=np.ones(len(item_names), dtype=np.int64),
+            total_prices=prices,
+            total=float(prices.sum()),
+        )
+
+    def _convert_prices_to_float(self, price_strs: list[str]) -> np.ndarray:
+        """Helper to cleanup price strings, separators are dropped."""
+        prices = pd.Series(price_strs, dtype=str)
+        prices = prices.str.replace(_SEPARATOR_RE, "", regex=True)
+        return prices.astype(np.float64).to_numpy()
\ No newline at end of file
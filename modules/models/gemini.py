@@ -1,18 +1,21 @@
-import base64
-import json
 import os
 from io import BytesIO
 
+import orjson
+import streamlit as st
 from langchain_core.messages import HumanMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from PIL import Image
 
-from modules.data.receipt_data import ItemData, ReceiptData
-from modules.utils import AIError, SettingsError
+from modules.data import session_data
+from modules.data.receipt_data import ReceiptData
+from modules.utils import AIError, SettingsError, resize_to_max_side
 
 from .base import AIModel
 
 MODEL_NAME = "gemini-2.5-flash"
+# Longest image side sent to Gemini, enough to read a receipt
+MAX_IMAGE_SIDE = 1600
 
 PROMPT = """
 You are given an image of a receipt. Please read the content into JSON format:
@@ -38,6 +41,24 @@ Note that no need to give unit price
 return only in JSON format
 """
 
+# Static text part of the request, shared by all requests
+_TEXT_PART = {"type": "text", "text": PROMPT}
+
+
+@st.cache_resource(show_spinner=False)
+def _load_llm(api_key: str) -> ChatGoogleGenerativeAI:
+    """Create Gemini client once per API key, reusing its connection.
+
+    Args:
+        api_key (str): Google API key
+
+    Returns:
+        ChatGoogleGenerativeAI: Gemini chat client
+    """
+    return ChatGoogleGenerativeAI(
+        model=MODEL_NAME, temperature=0.0, google_api_key=api_key
+    )
+
 
 class GeminiModel(AIModel):
     """Receipt reader based on Gemini model API."""
@@ -48,27 +69,32 @@ class GeminiModel(AIModel):
             raise SettingsError(
                 "No Google API key has been set. Please set it when using Gemini."
             )
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0)
+        self.llm = _load_llm(os.environ["GOOGLE_API_KEY"])
 
-    def run(self, image: Image.Image) -> ReceiptData:
+    def run(
+        self,
+        image: Image.Image,
+        image_file: tuple[bytes, str, tuple[int, int]] | None = None,
+    ) -> ReceiptData:
         """Retrieve data from the receipt.
 
         Args:
             image (Image.Image): the receipt photo image
+            image_file (tuple[bytes, str, tuple[int, int]] | None, optional):
+                original uploaded file bytes, its mime type and image size,
+                sent as is when small enough. Defaults to None.
 
         Returns:
             ReceiptData: parsed receipt data
         """
-        image_b64 = self._encode_image(image)
+        img_bytes, mime = self._encode_image(image, image_file)
         message = HumanMessage(
             content=[
+                _TEXT_PART,
                 {
-                    "type": "text",
-                    "text": PROMPT,
-                },
-                {
-                    "type": "image_url",
-                    "image_url": f"data:image/png;base64,{image_b64}",
+                    "type": "media",
+                    "mime_type": mime,
+                    "data": img_bytes,
                 },
             ]
         )
@@ -80,19 +106,57 @@ class GeminiModel(AIModel):
         except Exception as err:
             raise AIError(f"Unable to parse Gemini response: {response}") from err
 
-    def _encode_image(self, image: Image.Image) -> str:
-        """Encode image to base64 for Gemini request.
+    def run_batch(self, images: list[Image.Image]) -> list[ReceiptData]:
+        """Retrieve data from several receipt pages.
+
+        The original uploaded files are used when they match the images.
+
+        Args:
+            images (list[Image.Image]): the receipt photo images
+
+        Returns:
+            list[ReceiptData]: parsed receipt data, one per image
+        """
+        image_files = session_data.image_files.get()
+        if image_files is None or len(image_files) != len(images):
+            image_files = [None] * len(images)
+        return [
+            self.run(image, image_file)
+            for image, image_file in zip(images, image_files)
+        ]
+
+    def _encode_image(
+        self,
+        image: Image.Image,
+        image_file: tuple[bytes, str, tuple[int, int]] | None = None,
+    ) -> tuple[bytes, str]:
+        """Encode image to bytes sent inline in the Gemini request.
+
+        The original file bytes are used when available and the image in the
+        file is small enough. Otherwise the image is downscaled and encoded
+        to JPEG. The file size is checked, since the image may have been
+        decoded at a reduced size.
 
         Args:
             image (Image.Image): image data
+            image_file (tuple[bytes, str, tuple[int, int]] | None, optional):
+                original uploaded file bytes, its mime type and image size.
+                Defaults to None.
 
         Returns:
-            str: encoded image
+            tuple[bytes, str]: encoded image and its mime type
         """
-        buffer = BytesIO()
-        image.save(buffer, format="PNG")
-        img_bytes = buffer.getvalue()
-        return base64.b64encode(img_bytes).decode("utf-8")
+        if image_file is not None:
+            img_bytes, mime, original_size = image_file
+            if max(original_size) <= MAX_IMAGE_SIDE:
+                return img_bytes, mime
+
+        image = resize_to_max_side(image, MAX_IMAGE_SIDE)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        with BytesIO() as buffer:
+            image.save(buffer, format="JPEG", quality=85, optimize=False)
+            return buffer.getvalue(), "image/jpeg"
 
     def _format_response(self, response: str) -> ReceiptData:
         """Parse Gemini response into app receipt data.
@@ -104,18 +168,13 @@ class GeminiModel(AIModel):
             ReceiptData: the parsed data
         """
         dict_data = self._parse_response_to_dict(response)
-        total = dict_data["total"]
-        menus_list = dict_data["menus"]
-        items: list[ItemData] = []
-        for item in menus_list:
-            items.append(
-                ItemData(
-                    name=str(item["name"]),
-                    count=int(item["count"]),
-                    total_price=float(item["price"]),
-                )
-            )
-        return ReceiptData(items={it.id: it for it in items}, total=float(total))
+        menus = dict_data["menus"]
+        return ReceiptData.from_columns(
+            names=[str(menu["name"]) for menu in menus],
+            counts=[int(menu["count"]) for menu in menus],
+            total_prices=[float(menu["price"]) for menu in menus],
+            total=float(dict_data["total"]),
+        )
 
     def _parse_response_to_dict(self, response: str) -> dict:
         """Parse Gemini response text to data in dictionary format.
@@ -126,5 +185,9 @@ class GeminiModel(AIModel):
         Returns:
             dict: parsed dictionary
         """
-        clean_json_str = response.replace("```json", "").replace("```", "")
-        return json.loads(clean_json_str)
+        # slice the JSON object out of the markdown fences, if any
+        start = response.find("{")
+        end = response.rfind("}")
+        if start == -1 or end < start:
+            raise ValueError("No JSON object found in the response")
+        return orjson.loads(response[start : end + 1])
@@ -1,13 +1,17 @@
+import hashlib
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Type
+from typing import Any
+
+import streamlit as st
+from PIL import Image
 
 from modules.data import session_data
+from modules.data.receipt_data import ReceiptData
 from modules.utils import SettingsError
 
 from .base import AIModel
-from .donut import DonutModel
-from .gemini import GeminiModel
-from .easyocr import EasyOCRModel
 
 
 class ModelNames(Enum):
@@ -18,22 +22,29 @@ class ModelNames(Enum):
     EASYOCR = "EasyOCR"
 
 
-MODELS_LOADER: dict[ModelNames, Type[AIModel]] = {
-    ModelNames.GEMINI: GeminiModel,
-    ModelNames.DONUT: DonutModel,
-    ModelNames.EASYOCR: EasyOCRModel,
+# Module path and class name of each model, imported only when selected
+# so unused backends (torch, transformers, easyocr) are not loaded
+MODELS_LOADER: dict[ModelNames, tuple[str, str]] = {
+    ModelNames.GEMINI: ("modules.models.gemini", "GeminiModel"),
+    ModelNames.DONUT: ("modules.models.donut", "DonutModel"),
+    ModelNames.EASYOCR: ("modules.models.easyocr", "EasyOCRModel"),
 }
+# Local models with heavy weights, loaded in background once selected
+PREFETCH_MODELS = frozenset({ModelNames.DONUT, ModelNames.EASYOCR})
 
+_prefetch_executor = ThreadPoolExecutor(max_workers=1)
 
-def _load_model() -> AIModel:
-    """Load new model.
+
+def _get_model_config() -> tuple[ModelNames, dict[str, Any]]:
+    """Read the selected model and its settings from the session.
 
     Raises:
         SettingsError: if the settings are not configured correctly
             and model loading failed.
 
     Returns:
-        AIModel: loaded AI model.
+        tuple[ModelNames, dict[str, Any]]: the model name and the
+            arguments to create it with
     """
     model_name = session_data.model_name.get()
     try:
@@ -44,16 +55,118 @@ def _load_model() -> AIModel:
 
     if model_name not in MODELS_LOADER:
         raise SettingsError(f"Model name is not recognized {model_name}")
-    return MODELS_LOADER[model_name]()
+    if model_name == ModelNames.DONUT:
+        return model_name, {"quantize": session_data.donut_quantize.get()}
+    return model_name, {}
+
+
+def _build_model(model_name: ModelNames, model_kwargs: dict[str, Any]) -> AIModel:
+    """Import the model backend and create the model.
+
+    Does not read the session, so it can run outside the script thread.
+
+    Args:
+        model_name (ModelNames): the model to create
+        model_kwargs (dict[str, Any]): arguments to create the model with
+
+    Returns:
+        AIModel: created AI model
+    """
+    module_path, class_name = MODELS_LOADER[model_name]
+    model_class: type[AIModel] = getattr(
+        importlib.import_module(module_path), class_name
+    )
+    return model_class(**model_kwargs)
+
+
+def _load_model() -> AIModel:
+    """Load new model.
+
+    Raises:
+        SettingsError: if the settings are not configured correctly
+            and model loading failed.
+
+    Returns:
+        AIModel: loaded AI model.
+    """
+    return _build_model(*_get_model_config())
+
+
+def prefetch_model() -> None:
+    """Start loading the selected model in background if it is a local one.
+
+    The backend import and the weights loading happen while the user uploads
+    the receipt, instead of blocking the page on the first inference.
+    """
+    session_data.model_future.reset()
+    model_name, model_kwargs = _get_model_config()
+    if model_name not in PREFETCH_MODELS:
+        return
+    session_data.model_future.set(
+        _prefetch_executor.submit(_build_model, model_name, model_kwargs)
+    )
+
 
 def get_model() -> AIModel:
     """Get receipt reader model.
 
+    Waits for the model being prefetched, if any.
+
     Returns:
         AIModel: the loaded AI model
     """
     model = session_data.model.get()
     if model is None:
-        model = _load_model()
+        model_future = session_data.model_future.get_once()
+        model = model_future.result() if model_future is not None else _load_model()
         session_data.model.set(model)
     return model
+
+
+def _image_digest(image: Image.Image) -> str:
+    """Hash image pixels to be used as inference cache key.
+
+    Args:
+        image (Image.Image): the image
+
+    Returns:
+        str: hex digest of the image content
+    """
+    return hashlib.sha1(image.tobytes()).hexdigest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16, ttl=24 * 60 * 60)
+def _run_cached(
+    model_config: tuple[ModelNames, dict[str, Any]],
+    image_digests: tuple[str, ...],
+    _images: list[Image.Image],
+) -> list[ReceiptData]:
+    """Run the current model, cached by model settings and images content.
+
+    Args:
+        model_config (tuple[ModelNames, dict[str, Any]]): name of the model
+            and its settings, part of the cache key
+        image_digests (tuple[str, ...]): images digests, part of the cache key
+        _images (list[Image.Image]): the images, not hashed by streamlit
+
+    Returns:
+        list[ReceiptData]: parsed receipt data, one per image
+    """
+    return get_model().run_batch(_images)
+
+
+def run_cached(images: list[Image.Image]) -> list[ReceiptData]:
+    """Read receipt images with the current model, reusing previous results.
+
+    Results are cached as resources to skip pickling and hashing them on
+    every hit, so they are copied here to keep the cached entries intact.
+
+    Args:
+        images (list[Image.Image]): the receipt photo images
+
+    Returns:
+        list[ReceiptData]: parsed receipt data, one per image
+    """
+    image_digests = tuple(_image_digest(image) for image in images)
+    cached_results = _run_cached(_get_model_config(), image_digests, images)
+    return [receipt.copy() for receipt in cached_results]
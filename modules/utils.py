@@ -1,4 +1,8 @@
-from babel.numbers import format_currency
+from functools import lru_cache
+
+from babel import Locale
+from babel.numbers import get_currency_name, parse_pattern
+from PIL import Image
 
 from modules.data import session_data
 
@@ -25,13 +29,67 @@ CURRENCY_LIST = {
     "AED": "ar_AE",
 }
 
+# (code, locale, display name) of each currency, names are looked up once
+CURRENCIES: tuple[tuple[str, str, str], ...] = tuple(
+    (code, locale, get_currency_name(code)) for code, locale in CURRENCY_LIST.items()
+)
+CURRENCY_CODES: tuple[str, ...] = tuple(code for code, _, _ in CURRENCIES)
+
+
+# Parsed once, the same pattern is used for all currencies
+CURRENCY_PATTERN = parse_pattern("¤ #,##0.00")
+
 
-def format_number_to_currency(val: float) -> str:
-    currency = session_data.currency.get()
+@lru_cache(maxsize=32)
+def _get_locale(locale: str) -> Locale:
+    return Locale.parse(locale)
+
+
+def format_number_to_currency(val: float, currency: str | None = None) -> str:
+    if currency is None:
+        currency = session_data.currency.get()
     locale = CURRENCY_LIST.get(currency)
     if not locale:
         return str(val)
-    return format_currency(val, currency, locale=locale, format="¤ #,##0.00")
+    return CURRENCY_PATTERN.apply(val, _get_locale(locale), currency=currency)
+
+
+def resize_to_height(image: Image.Image, target_height: int) -> Image.Image:
+    """Resize image to a specific height.
+
+    Args:
+        image (Image.Image): image to resize
+        target_height (int): desired image height in pixels
+
+    Returns:
+        Image.Image: resized image
+    """
+    width, height = image.size
+    aspect_ratio = width / height
+    new_width = int(target_height * aspect_ratio)
+    resized_image = image.resize((new_width, target_height), Image.Resampling.LANCZOS)
+    return resized_image
+
+
+def resize_to_max_side(image: Image.Image, max_side: int) -> Image.Image:
+    """Downscale image so its longest side is at most a specific size.
+
+    Args:
+        image (Image.Image): image to resize
+        max_side (int): maximum width and height in pixels
+
+    Returns:
+        Image.Image: resized image, or the same image if it already fits
+    """
+    width, height = image.size
+    if max(width, height) <= max_side:
+        return image
+    if width >= height:
+        return image.resize(
+            (max_side, max(1, int(height * max_side / width))),
+            Image.Resampling.LANCZOS,
+        )
+    return resize_to_height(image, max_side)
 
 
 class AIError(Exception):
@@ -1,13 +1,25 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
 from typing import Callable
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 from PIL import Image
+from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from modules.data import session_data
 from modules.data.receipt_data import ReceiptData
 from modules.utils import format_number_to_currency
 
 IMAGE_DISPLAY_HEIGHT = 480
+# JPEG uploads are decoded at the smallest DCT scale still covering this size,
+# e.g. 12MP phone photos are decoded at half size
+JPEG_DRAFT_SIZE = (1500, 1500)
+
+# PIL releases the GIL while decoding and resizing, previews are
+# prepared here while the AI reads the receipt
+_preview_executor = ThreadPoolExecutor(max_workers=2)
 
 
 def get_items_table_columns_config() -> dict:
@@ -26,57 +38,103 @@ def get_items_table_columns_config() -> dict:
     }
 
 
-def resize_to_height(image: Image.Image, target_height: int) -> Image.Image:
-    """Resize image to a specific height.
+def image_input_view() -> list[Image.Image] | None:
+    """Element for user to upload the receipt pages.
+
+    Returns:
+        list[Image.Image] | None: uploaded images, None if
+            no image has been uploaded
+    """
+    uploaded_files = st.file_uploader(
+        "Choose an image...",
+        type=["jpg", "jpeg", "png"],
+        accept_multiple_files=True,
+        on_change=lambda: session_data.reset_uploaded_images(),
+    )
+    images = session_data.images.get()
+    if images is not None or len(uploaded_files) == 0:
+        return images
+    opened_images = [
+        open_uploaded_image(uploaded_file) for uploaded_file in uploaded_files
+    ]
+    images = [image for image, _ in opened_images]
+    image_files = [
+        (uploaded_file.getvalue(), uploaded_file.type, original_size)
+        for uploaded_file, (_, original_size) in zip(uploaded_files, opened_images)
+    ]
+    session_data.images.set(images)
+    session_data.image_files.set(image_files)
+    session_data.image_previews.set(
+        [
+            _preview_executor.submit(load_preview_image, img_bytes)
+            for img_bytes, _, _ in image_files
+        ]
+    )
+    return images
+
+
+def open_uploaded_image(
+    uploaded_file: UploadedFile,
+) -> tuple[Image.Image, tuple[int, int]]:
+    """Open uploaded image, letting the JPEG decoder downscale large photos.
 
     Args:
-        image (Image.Image): image to resize
-        target_height (int): desired image height in pixels
+        uploaded_file (UploadedFile): the uploaded image file
 
     Returns:
-        Image.Image: resized image
+        tuple[Image.Image, tuple[int, int]]: the opened image, not decoded
+            yet, and the image size in the file, before any downscale
     """
-    width, height = image.size
-    aspect_ratio = width / height
-    new_width = int(target_height * aspect_ratio)
-    resized_image = image.resize((new_width, target_height), Image.Resampling.LANCZOS)
-    return resized_image
+    image = Image.open(uploaded_file)
+    original_size = image.size
+    if uploaded_file.type == "image/jpeg":
+        image.draft("RGB", JPEG_DRAFT_SIZE)
+    return image, original_size
+
+
+def load_preview_image(img_bytes: bytes) -> Image.Image:
+    """Decode and resize uploaded image for preview.
 
+    Decoded from the file bytes, so it is independent from the image
+    given to the AI and can run in a background thread. A cheap
+    resampling is used since the browser rescales the preview anyway.
 
-def image_input_view() -> Image.Image | None:
-    """Element for user to upload image.
+    Args:
+        img_bytes (bytes): uploaded image file content
 
     Returns:
-        Image.Image | None: uploaded image, None if
-            no image has been uploaded
+        Image.Image: resized image for preview
     """
-    uploaded_file = st.file_uploader(
-        "Choose an image...",
-        type=["jpg", "jpeg", "png"],
-        on_change=lambda: session_data.reset_receipt_data(),
+    image = Image.open(BytesIO(img_bytes))
+    width, height = image.size
+    target_width = int(IMAGE_DISPLAY_HEIGHT * width / height)
+    image.thumbnail(
+        (target_width, IMAGE_DISPLAY_HEIGHT),
+        Image.Resampling.BILINEAR,
+        reducing_gap=2.0,
     )
-    if uploaded_file is None:
-        return session_data.image.get()
-    image = Image.open(uploaded_file)
-    session_data.image.set(image)
     return image
 
 
 @st.dialog("Reading your receipt...")
 def read_receipt_view(
-    receipt_reader: Callable[[Image.Image], ReceiptData], image: Image.Image
+    receipt_reader: Callable[[list[Image.Image]], list[ReceiptData]],
+    images: list[Image.Image],
 ) -> None:
     """Pop-up when AI reading the receipt.
 
+    All pages are sent to the AI as one batch, then the results
+    are combined into a single receipt.
+
     Args:
-        receipt_reader (Callable[[Image.Image], ReceiptData]): the callable
-            that will trigger the AI to run inference on the image
-        image (Image.Image): uploaded image by user
+        receipt_reader (Callable[[list[Image.Image]], list[ReceiptData]]): the
+            callable that will trigger the AI to run inference on the images
+        images (list[Image.Image]): uploaded images by user
     """
     _, col2, _ = st.columns([4.75, 0.5, 4.75])
     with col2:
         with st.spinner(""):
-            receipt = receipt_reader(image)
+            receipt = ReceiptData.merge(receipt_reader(images))
             session_data.view1_model_result.set(receipt)
             st.rerun()
 
@@ -88,16 +146,19 @@ def receipt_read_confirmation_view(receipt: ReceiptData) -> None:
     Args:
         receipt (ReceiptData): the receipt data read by the AI
     """
+    currency = session_data.currency.get()
+
     # confirm items data
     st.markdown("### Are these data correct?")
     st.markdown("You can edit the data")
     edited_data = st.data_editor(
-        receipt.to_items_df(),
+        receipt.items_df,
         num_rows="dynamic",
         hide_index=True,
         column_config=get_items_table_columns_config(),
     )
-    subtotal_str = format_number_to_currency(edited_data["total_price"].sum())
+    prices = pd.to_numeric(edited_data["total_price"], errors="coerce").to_numpy()
+    subtotal_str = format_number_to_currency(float(np.nansum(prices)), currency)
     st.markdown(f"Subtotal: {subtotal_str}")
 
     # confirm total bill
@@ -106,7 +167,7 @@ def receipt_read_confirmation_view(receipt: ReceiptData) -> None:
     edited_total = st.number_input(
         "Total price", value=receipt.total, label_visibility="collapsed"
     )
-    total_str = format_number_to_currency(edited_total)
+    total_str = format_number_to_currency(edited_total, currency)
     st.markdown(f"Total: {total_str}")
 
     # user approval action
@@ -119,13 +180,14 @@ def receipt_read_confirmation_view(receipt: ReceiptData) -> None:
         st.rerun()
 
 
-def image_preview_view(image: Image.Image) -> None:
+def image_preview_view(preview: Future[Image.Image]) -> None:
     """Eelemnt to preview the uploaded image.
 
     Args:
-        image (Image.Image): the uploaded image
+        preview (Future[Image.Image]): the uploaded image being
+            prepared for preview
     """
-    st.image(resize_to_height(image, IMAGE_DISPLAY_HEIGHT), width="stretch")
+    st.image(preview.result(), width="stretch")
 
 
 def final_receipt_view() -> None:
@@ -135,39 +197,45 @@ def final_receipt_view() -> None:
         st.warning("No data has been read yet...")
         return
     st.dataframe(
-        receipt.to_items_df(),
+        receipt.items_df,
         hide_index=True,
         column_config=get_items_table_columns_config(),
     )
-    st.markdown(f"##### Subtotal: {format_number_to_currency(receipt.subtotal)}")
-    st.markdown(f"##### Total: {format_number_to_currency(receipt.total)}")
+    currency = session_data.currency.get()
+    subtotal_str = format_number_to_currency(receipt.subtotal, currency)
+    total_str = format_number_to_currency(receipt.total, currency)
+    st.markdown(f"##### Subtotal: {subtotal_str}")
+    st.markdown(f"##### Total: {total_str}")
 
 
-def controller(receipt_reader: Callable[[Image.Image], ReceiptData]) -> bool:
+def controller(
+    receipt_reader: Callable[[list[Image.Image]], list[ReceiptData]],
+) -> bool:
     """Main controller of the page 1, receipt upload.
 
     Args:
-        receipt_reader (Callable[[Image.Image], ReceiptData]): the callable
-            that will trigger the AI to run inference on the image
+        receipt_reader (Callable[[list[Image.Image]], list[ReceiptData]]): the
+            callable that will trigger the AI to run inference on the images
 
     Returns:
         bool: True if user has completed all required actions in
         this page
     """
-    image = image_input_view()
-    if image is None:
+    images = image_input_view()
+    if images is None:
         return False
     if session_data.receipt_data.get() is None:
         reading_data = session_data.view1_model_result.get_once()
         if reading_data is None:
-            read_receipt_view(receipt_reader, image)
+            read_receipt_view(receipt_reader, images)
         else:
             receipt_read_confirmation_view(reading_data)
 
     st.markdown("### Your receipt data")
     col1, col2 = st.columns([3, 7])
     with col1:
-        image_preview_view(image)
+        for preview in session_data.image_previews.get():
+            image_preview_view(preview)
     with col2:
         final_receipt_view()
     return session_data.view1_auto_next_page.get_once()
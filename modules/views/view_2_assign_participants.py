@@ -1,3 +1,5 @@
+import functools
+
 import streamlit as st
 
 from modules.data import session_data
@@ -9,13 +11,49 @@ from modules.data.assignment_data import (
 )
 
 
-def participant_data_view(participant: ParticipantData, manager: SplitManager) -> None:
+_WARNING_SIGN_TEMPLATE = """
+        <div style="
+            color: {color};
+            padding: 0.5rem 1rem;
+            border-radius: 0.5rem;
+            height: 38px;  
+            overflow-y: auto;
+            display: flex;
+            align-items: center;
+        ">
+            <div> {icon} &nbsp; {text} </div>
+        </div>
+        """
+
+_WARNING_ICON_TEMPLATE = """
+    <svg xmlns="http://www.w3.org/2000/svg" height="20px" viewBox="0 -960 960 960" width="20px" fill="{color}"><path d="M480-280q17 0 28.5-11.5T520-320q0-17-11.5-28.5T480-360q-17 0-28.5 11.5T440-320q0 17 11.5 28.5T480-280Zm-40-160h80v-240h-80v240Zm40 360q-83 0-156-31.5T197-197q-54-54-85.5-127T80-480q0-83 31.5-156T197-763q54-54 127-85.5T480-880q83 0 156 31.5T763-763q54 54 85.5 127T880-480q0 83-31.5 156T763-197q-54 54-127 85.5T480-80Zm0-80q134 0 227-93t93-227q0-134-93-227t-227-93q-134 0-227 93t-93 227q0 134 93 227t227 93Zm0-320Z"/></svg>
+    """
+
+
+@st.fragment
+def participant_data_view(
+    participant: ParticipantData,
+    manager: SplitManager,
+    totals: dict[int, int],
+    item_labels: dict[int, str],
+    revision: int,
+) -> None:
     """Element to show a participant data.
 
+    Runs as a fragment, so interactions that only affect this participant
+    (e.g. picking a new item) do not re-render the other participants.
+
     Args:
         participant (ParticipantData): the participant data
         manager (SplitManager): the split assignment manager
+        totals (dict[int, int]): assigned count of each item ID
+            accross participants
+        item_labels (dict[int, str]): display name of each item ID
+        revision (int): manager revision the totals were computed at
     """
+    if manager.revision != revision:
+        # assigned counts changed, other participants and the summary are stale
+        st.rerun()
     with st.container(border=True):
         col1, col2 = st.columns([9, 1])
         with col1:
@@ -27,7 +65,7 @@ def participant_data_view(participant: ParticipantData, manager: SplitManager) -
                 icon=":material/delete:",
                 type="primary",
             )
-        participant_detail_view(participant, manager)
+        participant_detail_view(participant, manager, totals, item_labels)
 
     if delete_button:
         manager.remove_participant(participant.id)
@@ -35,42 +73,53 @@ def participant_data_view(participant: ParticipantData, manager: SplitManager) -
 
 
 def participant_detail_view(
-    participant: ParticipantData, manager: SplitManager
+    participant: ParticipantData,
+    manager: SplitManager,
+    totals: dict[int, int],
+    item_labels: dict[int, str],
 ) -> None:
     """Element for user to assign items to the participant.
 
     Args:
         participant (ParticipantData): the participant data
         manager (SplitManager): the split assignment manager
+        totals (dict[int, int]): assigned count of each item ID
+            accross participants
+        item_labels (dict[int, str]): display name of each item ID
     """
     current_items = manager.get_participant_items_assignment_list(participant.id)
     items_to_delete = []
     for idx, item in enumerate(current_items):
-        is_del = added_item_view(
-            participant, item, manager.get_items_assignment_total(item.item.id)
-        )
+        is_del = added_item_view(participant, idx, item, manager, totals)
         if is_del:
             items_to_delete.append(idx)
     if len(items_to_delete) > 0:
         manager.remove_items_assignment(participant.id, items_to_delete)
         st.rerun()
-    new_item_selection_view(participant, manager)
+    new_item_selection_view(participant, manager, item_labels)
 
 
 def added_item_view(
-    participant: ParticipantData, item: AssignedItemData, current_assigned_total: int
+    participant: ParticipantData,
+    idx: int,
+    item: AssignedItemData,
+    manager: SplitManager,
+    totals: dict[int, int],
 ) -> bool:
     """Element that shows and interact with item assigned to a participant.
 
     Args:
         participant (ParticipantData): the participant data
+        idx (int): index of the item assignment in the participant's list
         item (AssignedItemData): the item assignment data
-        current_assigned_total (int): the already assigned number of this
-            particular item accross participants.
+        manager (SplitManager): the split assignment manager
+        totals (dict[int, int]): assigned count of each item ID
+            accross participants
 
     Returns:
         bool: True if the user click delete of this item assignment
     """
+    assigned_item = item.resolve(manager.receipt_data)
     del_col, name_col, num_col, detail_col = st.columns([0.5, 4, 2, 3.5])
     with del_col:
         del_item = st.button(
@@ -83,7 +132,7 @@ def added_item_view(
         st.markdown(
             f"""
             <div style="margin-top: 1vh;">
-                <p>{item.item.name}</p>
+                <p>{assigned_item.name}</p>
             </div>
             """,
             unsafe_allow_html=True,
@@ -96,11 +145,13 @@ def added_item_view(
             step=1,
             min_value=0,
             label_visibility="collapsed",
-            on_change=lambda: on_item_count_change(key_name, item),
+            on_change=lambda: on_item_count_change(
+                key_name, manager, participant.id, idx
+            ),
             key=key_name,
         )
     with detail_col:
-        difference = item.item.count - current_assigned_total
+        difference = assigned_item.count - totals[item.item_id]
         if difference > 0:
             item_warning_sign(f"Unassigned: {difference}", color="#fffec8")
         elif difference < 0:
@@ -108,17 +159,21 @@ def added_item_view(
     return del_item
 
 
-def on_item_count_change(key_name: str, item: AssignedItemData) -> None:
+def on_item_count_change(
+    key_name: str, manager: SplitManager, participant_id: int, idx: int
+) -> None:
     """Callbacks to be called when user change count of the assigned item.
 
     Args:
         key_name (str): the count input element key name
-        item (AssignedItemData): the item assignment data
+        manager (SplitManager): the split assignment manager
+        participant_id (int): participant ID
+        idx (int): index of the item assignment in the participant's list
     """
     new_val = st.session_state.get(key_name)
     if new_val is None:
         return
-    item.set_count(new_val)
+    manager.set_assigned_count(participant_id, idx, new_val)
 
 
 def item_warning_sign(text: str, color: str) -> None:
@@ -128,24 +183,25 @@ def item_warning_sign(text: str, color: str) -> None:
         text (str): the text to be shown
         color (str): the color of the text
     """
-    st.markdown(
-        f"""
-        <div style="
-            color: {color};
-            padding: 0.5rem 1rem;
-            border-radius: 0.5rem;
-            height: 38px;  
-            overflow-y: auto;
-            display: flex;
-            align-items: center;
-        ">
-            <div> {warning_icon(color)} &nbsp; {text} </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
+    st.markdown(warning_sign_html(color).format(text=text), unsafe_allow_html=True)
+
+
+@functools.lru_cache(maxsize=8)
+def warning_sign_html(color: str) -> str:
+    """HTML of warning notification, built once per color.
+
+    Args:
+        color (str): the color of the text
+
+    Returns:
+        str: the warning notification HTML, with `{text}` placeholder
+    """
+    return _WARNING_SIGN_TEMPLATE.format(
+        color=color, icon=warning_icon(color), text="{text}"
     )
 
 
+@functools.lru_cache(maxsize=8)
 def warning_icon(color: str) -> str:
     """Warning icon from material.
 
@@ -155,30 +211,29 @@ def warning_icon(color: str) -> str:
     Returns:
         str: the warning icon as string
     """
-    return f"""
-    <svg xmlns="http://www.w3.org/2000/svg" height="20px" viewBox="0 -960 960 960" width="20px" fill="{color}"><path d="M480-280q17 0 28.5-11.5T520-320q0-17-11.5-28.5T480-360q-17 0-28.5 11.5T440-320q0 17 11.5 28.5T480-280Zm-40-160h80v-240h-80v240Zm40 360q-83 0-156-31.5T197-197q-54-54-85.5-127T80-480q0-83 31.5-156T197-763q54-54 127-85.5T480-880q83 0 156 31.5T763-763q54 54 85.5 127T880-480q0 83-31.5 156T763-197q-54 54-127 85.5T480-80Zm0-80q134 0 227-93t93-227q0-134-93-227t-227-93q-134 0-227 93t-93 227q0 134 93 227t227 93Zm0-320Z"/></svg>
-    """
+    return _WARNING_ICON_TEMPLATE.format(color=color)
 
 
 def new_item_selection_view(
-    participant: ParticipantData, manager: SplitManager
+    participant: ParticipantData, manager: SplitManager, item_labels: dict[int, str]
 ) -> None:
     """Eelement for user to add new item assigned to participant.
 
     Args:
         participant (ParticipantData): the participant data
         manager (SplitManager): the split assignment manager
+        item_labels (dict[int, str]): display name of each item ID
     """
     _, item_col, add_col, _ = st.columns([0.5, 4, 2, 3.5])
     with item_col:
         selected_item = st.selectbox(
             "Purhcased item",
-            manager.item_ids,
+            list(item_labels),
             index=None,
             placeholder="New item",
             label_visibility="collapsed",
             key=f"item_selection_{participant.id}",
-            format_func=lambda x: manager.get_item(int(x)).name,
+            format_func=item_labels.__getitem__,
         )
     with add_col:
         add_item = st.button(
@@ -191,7 +246,7 @@ def new_item_selection_view(
         st.rerun()
 
 
-def warning_summary_view(manager: SplitManager) -> bool:
+def warning_summary_view(manager: SplitManager, totals: dict[int, int]) -> bool:
     """Element that shows uncomplete action that user need to take.
 
     It can be items that are not assigned yet or items that are
@@ -199,6 +254,8 @@ def warning_summary_view(manager: SplitManager) -> bool:
 
     Args:
         manager (SplitManager): the split assignment manager
+        totals (dict[int, int]): assigned count of each item ID
+            accross participants
 
     Returns:
         bool: True if all items are assigned well, False otherwise
@@ -207,8 +264,7 @@ def warning_summary_view(manager: SplitManager) -> bool:
     unassigned_list = []
     over_list = []
     for item in items:
-        current_assigned = manager.get_items_assignment_total(item.id)
-        difference = item.count - current_assigned
+        difference = item.count - totals[item.id]
         if difference > 0:
             unassigned_list.append(f"{item.name} ({difference})")
         if difference < 0:
@@ -281,7 +337,11 @@ def controller() -> bool:
         manager = SplitManager(group_data, receipt)
         session_data.split_manager.set(manager)
 
-    for participant in list(manager.group_data.participants.values()):
-        participant_data_view(participant, manager)
-    is_ok = warning_summary_view(manager)
+    revision = manager.revision
+    totals = manager.get_all_assignment_totals()
+    item_labels = {it.id: it.name for it in manager.get_all_items()}
+    # deleting a participant reruns the script, so no copy is needed
+    for participant in manager.group_data.participants.values():
+        participant_data_view(participant, manager, totals, item_labels, revision)
+    is_ok = warning_summary_view(manager, totals)
     return participant_adder_and_submit_view(manager.group_data, is_ok)
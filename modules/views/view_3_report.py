@@ -1,15 +1,17 @@
 import streamlit as st
 
+from modules.data import session_data
 from modules.data.report_data import ParticipantReportData, ReportData
 from modules.utils import format_number_to_currency
 
 
-def participant_view(participant_report: ParticipantReportData) -> None:
+def participant_view(participant_report: ParticipantReportData, currency: str) -> None:
     """Element to show report of a participant.
 
     Args:
         participant_report (ParticipantReportData): the participant
             report data
+        currency (str): currency code used to format prices
     """
     with st.container(border=True):
         name_col, total_str_col, total_col = st.columns([7, 1, 2])
@@ -19,13 +21,19 @@ def participant_view(participant_report: ParticipantReportData) -> None:
             st.markdown("##### Total:")
         with total_col:
             total_str = format_number_to_currency(
-                int(participant_report.purchased_total)
+                int(participant_report.purchased_total), currency
             )
             st.markdown(f"##### {total_str}")
-        st.table(participant_report.to_dataframe_display(), border="horizontal")
-        subtotal_str = format_number_to_currency(participant_report.purchased_subtotal)
+        st.table(
+            participant_report.to_dataframe_display(currency), border="horizontal"
+        )
+        subtotal_str = format_number_to_currency(
+            participant_report.purchased_subtotal, currency
+        )
         st.markdown(f"###### Subtotal: {subtotal_str}")
-        total_str = format_number_to_currency(participant_report.purchased_others)
+        total_str = format_number_to_currency(
+            participant_report.purchased_others, currency
+        )
         st.markdown(f"###### Others\*: {total_str}")
 
 
@@ -39,7 +47,8 @@ def controller(report: ReportData | None) -> bool:
     if report is None:
         st.error("Please submit assignment first!")
         return False
+    currency = session_data.currency.get()
     for participant_report in report.participants_reports:
-        participant_view(participant_report)
+        participant_view(participant_report, currency)
     st.markdown("*\*tax, services, discount, etc.*")
     return False
@@ -1,12 +1,19 @@
 import os
 from dataclasses import dataclass, field
+from importlib.util import find_spec
 
 import streamlit as st
-from babel.numbers import get_currency_name
 
 from modules.data import session_data
-from modules.models.loader import ModelNames
-from modules.utils import CURRENCY_LIST
+from modules.models.loader import ModelNames, prefetch_model
+from modules.utils import CURRENCIES, CURRENCY_CODES
+
+_CURRENCY_LABEL = {code: f"{code}: {name}" for code, _, name in CURRENCIES}
+_CURRENCY_INDEX = {code: i for i, code in enumerate(CURRENCY_CODES)}
+_MODEL_OPTIONS = tuple(ModelNames)
+_MODEL_INDEX = {model: i for i, model in enumerate(_MODEL_OPTIONS)}
+# int8 quantization on GPU needs bitsandbytes, checked without importing torch
+_HAS_BITSANDBYTES = find_spec("bitsandbytes") is not None
 
 
 @dataclass
@@ -15,6 +22,7 @@ class SettingsData:
 
     currency: str = field(default_factory=session_data.currency.get)
     model_name: ModelNames = field(default_factory=session_data.model_name.get)
+    donut_quantize: bool = field(default_factory=session_data.donut_quantize.get)
     gemini_api_key: str | None = field(
         default_factory=lambda: os.environ.get("GOOGLE_API_KEY")
     )
@@ -22,11 +30,17 @@ class SettingsData:
     def apply(self) -> None:
         """Apply the settings stored in this object."""
         session_data.currency.set(self.currency)
-        if self.model_name != session_data.model_name.get():
-            session_data.model.reset()
+        model_changed = (
+            self.model_name != session_data.model_name.get()
+            or self.donut_quantize != session_data.donut_quantize.get()
+        )
         session_data.model_name.set(self.model_name)
+        session_data.donut_quantize.set(self.donut_quantize)
         if self.gemini_api_key is not None and self.gemini_api_key != "":
             os.environ["GOOGLE_API_KEY"] = self.gemini_api_key
+        if model_changed:
+            session_data.model.reset()
+            prefetch_model()
 
 
 def currency_settings_view(settings: SettingsData) -> SettingsData:
@@ -38,15 +52,11 @@ def currency_settings_view(settings: SettingsData) -> SettingsData:
     Returns:
         SettingsData: the updated settings data
     """
-    currencies = list(CURRENCY_LIST.keys())
-    current_idx = (
-        currencies.index(settings.currency) if settings.currency in currencies else 0
-    )
     selected_currency = st.selectbox(
         "Currency",
-        list(CURRENCY_LIST.keys()),
-        format_func=lambda x: f"{x}: {get_currency_name(x)}",
-        index=current_idx,
+        CURRENCY_CODES,
+        format_func=_CURRENCY_LABEL.__getitem__,
+        index=_CURRENCY_INDEX.get(settings.currency, 0),
     )
     settings.currency = selected_currency
     return settings
@@ -61,23 +71,26 @@ def model_selection_view(settings: SettingsData) -> SettingsData:
     Returns:
         SettingsData: the updated settings data
     """
-    models_options = list(ModelNames)
-    current_idx = (
-        models_options.index(settings.model_name)
-        if settings.model_name in models_options
-        else 0
-    )
     selected_model = st.selectbox(
         "AIModel",
-        list(models_options),
+        _MODEL_OPTIONS,
         format_func=lambda x: x.value,
-        index=current_idx,
+        index=_MODEL_INDEX.get(settings.model_name, 0),
     )
     if selected_model == ModelNames.GEMINI:
         google_key = st.text_input(
             "Google API Key", type="password", value=settings.gemini_api_key
         )
         settings.gemini_api_key = google_key
+    if selected_model == ModelNames.DONUT:
+        settings.donut_quantize = st.checkbox(
+            "Quantize decoder to int8", value=settings.donut_quantize
+        )
+        if settings.donut_quantize and not _HAS_BITSANDBYTES:
+            st.warning(
+                "bitsandbytes is not installed, "
+                "the model is not quantized when running on GPU."
+            )
     settings.model_name = selected_model
     return settings
 